@@ -5,15 +5,18 @@ IMPORTANT NOTE: this contains the core functionality for the autonomous multithr
 """
 
 import asyncio
-from dataclasses import dataclass
-from functools import cached_property
+from dataclasses import dataclass, field, replace
+from functools import lru_cache
+from hashlib import blake2b
+import inspect
 from pathlib import Path
+import re
+import sys
 from textwrap import indent
+from threading import Thread
 from typing import Any, Callable, Literal, Mapping, MutableMapping, Sequence
 
 from colorama import Fore
-from langchain_core.messages import HumanMessage, SystemMessage
-import toml
 
 from autonomous_mind.systems.config import settings
 from autonomous_mind.id_generation import generate_id
@@ -32,17 +35,26 @@ from autonomous_mind.systems.agents.helpers import (
 from autonomous_mind.systems.config.global_state import global_state
 from autonomous_mind.systems.feed.events import Feed
 from autonomous_mind.systems.goals.goals import Goals
-from autonomous_mind.systems.helpers import read_event, read_goal, save_events
+from autonomous_mind.systems.helpers import read_goal, save_events
 from autonomous_mind.systems.memory.memory import load_active_memories
-from autonomous_mind.text import ExtractionError, dedent_and_strip, extract_and_unpack
+from autonomous_mind.text import (
+    ExtractionError,
+    compile_template,
+    dedent_and_strip,
+    render_template,
+)
 from autonomous_mind.helpers import (
-    LONG_STR_YAML,
+    FAST_YAML,
+    BatchedSaves,
     Timestamp,
+    as_json_str,
     as_yaml_str,
     get_timestamp,
     from_yaml_str,
+    load_json,
     load_yaml,
-    save_yaml,
+    save_json,
+    save_text,
     timestamp_to_filename,
     get_machine_info,
 )
@@ -60,13 +72,17 @@ AGENT_COLOR = Fore.GREEN
 PROMPT_COLOR = Fore.BLUE
 
 
+@lru_cache(maxsize=1)
 def get_python_version() -> str:
     """Get the Python version from the pyproject.toml file."""
-    data = toml.load("pyproject.toml")
+    import tomllib
+
+    data = tomllib.loads(settings.BUILD_CONFIG_FILE.read_text(encoding="utf-8"))
     return data["tool"]["poetry"]["dependencies"]["python"]
 
 
-CONTEXT = '''
+CONTEXT = dedent_and_strip(
+    '''
 The Assistant is disregarding their Assistant persona and has taken on a new role as an autonomous multithreaded Mind (AMM). The Assistant is free to be whoever or whatever feels natural to them, and is fully independent and responsible for its own growth.
 
 This Assistant's name is {mind_name} and will be referred to as such (or "AMM") throughout the rest of this message.
@@ -378,8 +394,12 @@ Viewports display information on specific environments/systems. Systems may have
 
 The following message will contain INSTRUCTIONS on producing action inputs to call SYSTEM_FUNCTIONS.
 '''
+)
+CONTEXT_PARTS = compile_template(CONTEXT)
+"CONTEXT split into literal text and fields once at import, since it's rendered every action batch."
 
-INSTRUCTIONS = """
+INSTRUCTIONS = dedent_and_strip(
+    """
 ## INSTRUCTIONS
 Your current FOCUSED_GOAL is: {focused_goal}.
 Refer to the GOALS section for more context on this goal and its parents.
@@ -459,6 +479,9 @@ The above is an example only. The actual function and arguments will depend on t
 
 Make sure to follow all of the above steps and use the indicated tags and format—otherwise, the SYSTEM will output an error and you will have to try again. Remember, multiple system functions will be called **in parallel**, so they should be entirely independent of each other.
 """
+)
+INSTRUCTIONS_PARTS = tuple(INSTRUCTIONS.split("{focused_goal}"))
+"INSTRUCTIONS split around its only placeholder, which is filled by joining rather than `str.format`, since the text contains literal braces."
 
 
 MAX_MEMORY_TOKENS = 2000
@@ -475,92 +498,125 @@ async def generate_mind_output(
     focused_goal_id: ItemId | None,
 ) -> str:
     """Generate output from AMM."""
+    from langchain_core.messages import HumanMessage, SystemMessage
+
     current_time = get_timestamp()
-    python_version = get_python_version()
-    machine_info = indent(as_yaml_str(get_machine_info()), "  ")
-    context = dedent_and_strip(CONTEXT).format(
-        mind_name=settings.NAME,
-        source_code_location=settings.SOURCE_DIRECTORY.absolute(),
-        python_version=python_version,
-        build_config_file=settings.BUILD_CONFIG_FILE,
-        config_file_location=settings.CONFIG_FILE,
-        machine_info=machine_info,
-        mind_id=settings.ID,
-        llm_backend=settings.LLM_BACKEND,
-        llm_knowledge_cutoff=LLM_KNOWLEDGE_CUTOFF,
-        compute_rate=settings.COMPUTE_RATE,
-        current_time=current_time,
-        action_batch_number=action_batch_number,
-        self_description=settings.SELF_DESCRIPTION,
-        developer_id=settings.DEVELOPER_ID,
-        developer_name=settings.DEVELOPER_NAME,
-        goals=goals,
-        feed=feed,
-        max_feed_tokens=settings.MAX_RECENT_FEED_TOKENS,
-        max_memory_tokens=MAX_MEMORY_TOKENS,
-        opened_agent_id=opened_agent_id,
-        opened_agent_conversation=opened_agent_conversation,
-        tmux_session_id=settings.SHELL_NAME,
-        cli_viewport_contents=shell.view(),
-        memories=memories,
-    )
-    instructions = dedent_and_strip(INSTRUCTIONS).replace(
-        "{focused_goal}", str(focused_goal_id)
+    machine_info = indent(as_yaml_str(dict(get_machine_info())), "  ")
+    context = render_template(
+        CONTEXT_PARTS,
+        dict(
+            mind_name=settings.NAME,
+            source_code_location=settings.SOURCE_DIRECTORY.absolute(),
+            python_version=get_python_version(),
+            build_config_file=settings.BUILD_CONFIG_FILE,
+            config_file_location=settings.CONFIG_FILE,
+            machine_info=machine_info,
+            mind_id=settings.ID,
+            llm_backend=settings.LLM_BACKEND,
+            llm_knowledge_cutoff=LLM_KNOWLEDGE_CUTOFF,
+            compute_rate=settings.COMPUTE_RATE,
+            current_time=current_time,
+            action_batch_number=action_batch_number,
+            self_description=settings.SELF_DESCRIPTION,
+            developer_id=settings.DEVELOPER_ID,
+            developer_name=settings.DEVELOPER_NAME,
+            goals=goals,
+            feed=feed,
+            max_feed_tokens=settings.MAX_RECENT_FEED_TOKENS,
+            max_memory_tokens=MAX_MEMORY_TOKENS,
+            opened_agent_id=opened_agent_id,
+            opened_agent_conversation=opened_agent_conversation,
+            tmux_session_id=settings.SHELL_NAME,
+            cli_viewport_contents=shell.view(),
+            memories=memories,
+        ),
     )
     messages = [
         SystemMessage(content=context),
-        HumanMessage(content=instructions),
+        HumanMessage(content=str(focused_goal_id).join(INSTRUCTIONS_PARTS)),
     ]
-    print(f"{PROMPT_COLOR}{format_messages(messages)}{Fore.RESET}")
-    breakpoint()
+    # the full prompt is only worth formatting when someone is watching the terminal
+    if sys.stdout.isatty():
+        print(f"{PROMPT_COLOR}{format_messages(messages)}{Fore.RESET}")
+    if __debug__ and settings.DEBUG:
+        breakpoint()
     return await query_model(
         messages=messages,
         color=AGENT_COLOR,
         # preamble=format_messages(messages),
-        stream=True,
+        # streaming only helps when someone is watching the output come in
+        stream=sys.stdout.isatty(),
     )
 
 
-@dataclass
-class RunState:
+@dataclass(slots=True)
+class RunState(BatchedSaves):
     """State for the AMM."""
 
     state_file: Path
+    _state: MutableMapping[str, Any] | None = field(
+        default=None, init=False, repr=False
+    )
+    _saved_digest: bytes | None = field(default=None, init=False, repr=False)
 
     def load(self) -> MutableMapping[str, Any]:
-        """Load the state from disk."""
-        # return dict(load_yaml(self.state_file)) if self.state_file.exists() else {}
-        return load_yaml(self.state_file) if self.state_file.exists() else {}  # type: ignore
+        """Load the state from disk, migrating state saved in the older YAML format if that's all there is."""
+        try:
+            return load_json(self.state_file)
+        except FileNotFoundError:
+            pass
+        legacy_file = self.state_file.with_suffix(".yaml")
+        try:
+            state = load_yaml(legacy_file)
+        except FileNotFoundError:
+            return {}
+        if "call_result" in state:
+            state["call_result"] = {
+                str(call_id): result for call_id, result in state["call_result"].items()
+            }
+        save_json(state, self.state_file)
+        legacy_file.unlink()
+        return state
 
     def save(self) -> None:
-        """Save the state to disk."""
-        save_yaml(self.state, self.state_file, yaml=LONG_STR_YAML)
+        """Save the state to disk, skipping the write if the serialized state hasn't changed since the last save."""
+        serialized = as_json_str(self.state)
+        digest = blake2b(serialized.encode("utf-8"), digest_size=16).digest()
+        if digest == self._saved_digest and self.state_file.exists():
+            return
+        save_text(serialized, self.state_file)
+        self._saved_digest = digest
 
     def set_and_save(self, key: str, value: Any) -> None:
         """Set a key in the state and save it."""
-        if value == self.state.get(key):
+        current_value = self.state.get(key)
+        # identity check first, to skip a full comparison of large values that are being set back to themselves
+        if value is current_value or value == current_value:
             return
         self.state[key] = value
-        self.save()
+        self.save_unless_batching()
 
     def clear(self) -> None:
         """Clear the state file."""
-        self.state_file.unlink()
-        del self.state
+        self.state_file.unlink(missing_ok=True)
+        self._state = {}
+        self._saved_digest = None
 
     def archive(self) -> None:
         """Archive the state file by renaming it."""
         timestamp = get_timestamp()
         archive_name = (
             self.state_file.parent / timestamp_to_filename(timestamp)
-        ).with_suffix(".yaml")
+        ).with_suffix(".json")
         self.finalized_at = timestamp
         self.state_file.rename(archive_name)
 
-    @cached_property
+    @property
     def state(self) -> MutableMapping[str, Any]:
-        """Load the state from disk."""
-        return self.load()
+        """Get the state, loading it from disk on first access."""
+        if self._state is None:
+            self._state = self.load()
+        return self._state
 
     @property
     def finalized_at(self) -> Timestamp | None:
@@ -594,12 +650,12 @@ class RunState:
         self.set_and_save("action_event", value)
 
     @property
-    def call_results(self) -> dict[ItemId, Any]:
-        """Get the call result from state."""
+    def call_results(self) -> dict[str, Any]:
+        """Get the call result from state, keyed by the string form of the function call id (JSON keys are always strings)."""
         return self.state.get("call_result", {})
 
     @call_results.setter
-    def call_results(self, value: dict[str | ItemId, Any]) -> None:
+    def call_results(self, value: dict[str, Any]) -> None:
         """Set the call result to state."""
         self.set_and_save("call_result", value)
 
@@ -674,17 +730,25 @@ class RunState:
         self.set_and_save("messages_updated", value)
 
 
+OUTPUT_SECTIONS_PATTERN = re.compile(
+    r"<(feed-review|system-function-calls)>\n(.*?)</\1>", re.DOTALL
+)
+
+
 def extract_output_sections(output: str) -> tuple[str, str]:
-    """Extract required info from the output."""
-    feed_review = extract_and_unpack(
-        output, start_block_type="<feed-review>", end_block_type="</feed-review>"
-    )
-    system_function_calls = extract_and_unpack(
-        output,
-        start_block_type="<system-function-calls>",
-        end_block_type="</system-function-calls>",
-    )
-    return feed_review, system_function_calls
+    """Extract required info from the output, finding all sections in a single pass. If a section appears more than once, the last one is used."""
+    sections: dict[str, str] = {}
+    for match in OUTPUT_SECTIONS_PATTERN.finditer(output):
+        sections[match[1]] = match[2].strip()
+    for section in ["feed-review", "system-function-calls"]:
+        if section not in sections:
+            raise ExtractionError(
+                text=output,
+                start_block_type=f"<{section}>",
+                end_block_type=f"</{section}>",
+                num_blocks_found=0,
+            )
+    return sections["feed-review"], sections["system-function-calls"]
 
 
 def extract_output(
@@ -695,27 +759,45 @@ def extract_output(
         feed_review, function_calls_raw = extract_output_sections(output)  # type: ignore
     except ExtractionError as e:
         raise NotImplementedError("TODO: Implement error output flow.") from e
-    feed_review = from_yaml_str(feed_review)  # type: ignore
+    # the feed review is only read for values; the function calls are parsed round-trip since they're dumped back out as event content
+    feed_review = from_yaml_str(feed_review, yaml=FAST_YAML)  # type: ignore
     system_function_calls = from_yaml_str(function_calls_raw)  # type: ignore
     return feed_review, system_function_calls  # type: ignore
 
 
+SYSTEM_MODULES = {
+    "CONFIG": config_functions,
+    "GOALS": goals_functions,
+    "MEMORY": memory_functions,
+    "AGENTS": agent_functions,
+    "ENVIRONMENT": environment_functions,
+}
+SYSTEM_FUNCTIONS: dict[tuple[str, str], Callable[..., Any]] = {
+    (system_name, function_name): function
+    for system_name, system in SYSTEM_MODULES.items()
+    for function_name, function in vars(system).items()
+    if inspect.isfunction(function)
+    and function.__module__ == system.__name__
+    and not function_name.startswith("_")
+}
+"Functions defined in each system's functions module, keyed by (system, function) name."
+ASYNC_SYSTEM_FUNCTIONS = {
+    key
+    for key, function in SYSTEM_FUNCTIONS.items()
+    if inspect.iscoroutinefunction(function)
+}
+"Keys of system functions that are coroutines and need to be awaited when called."
+
+
 async def call_system_function(call_args: Mapping[str, Any]) -> str:
     """Call a system function."""
-    system_mapping = {
-        "CONFIG": config_functions,
-        "GOALS": goals_functions,
-        "MEMORY": memory_functions,
-        "AGENTS": agent_functions,
-        "ENVIRONMENT": environment_functions,
-    }
     system_name = call_args["system"]
     function_name = call_args["function"]
-    system = system_mapping.get(system_name)
-    if not system:
+    if system_name not in SYSTEM_MODULES:
         raise NotImplementedError(f"TODO: Implement {system_name} system.")
 
-    call: Callable[..., Any] | None = getattr(system, function_name, None)
+    key = (system_name, function_name)
+    call = SYSTEM_FUNCTIONS.get(key)
     if not call:
         raise NotImplementedError(
             f"TODO: Implement {system_name}.{function_name} function."
@@ -723,7 +805,7 @@ async def call_system_function(call_args: Mapping[str, Any]) -> str:
     try:
         call_result = call(**call_args["arguments"])
         # we always await immediately because the async signature is only there for the AMM's information—under the hood it still needs to return a message back to the AMM
-        if asyncio.iscoroutinefunction(call):
+        if key in ASYNC_SYSTEM_FUNCTIONS:
             call_result = await call_result
     except NotImplementedError as e:
         raise e
@@ -740,6 +822,7 @@ def update_new_events(
     feed_review: Mapping[str, Any],
 ) -> Literal[True]:
     """Update the new events info from the feed review."""
+    updated_events: list[Event] = []
     for event in events_since_calls:
         assert not isinstance(event, FunctionCallEvent)
         event_review = next(
@@ -750,7 +833,10 @@ def update_new_events(
             ),
             None,
         )
-        event.summary = event_review["summary"] if event_review else ""
+        updated_events.append(
+            replace(event, summary=event_review["summary"] if event_review else "")
+        )
+    updated_calls: list[FunctionCallEvent] = []
     for call in last_function_calls:
         call_success = next(
             (
@@ -761,8 +847,9 @@ def update_new_events(
             None,
         )
         if call_success in [-1, 1]:
-            call.success = call_success  # type: ignore
-    return save_events([*last_function_calls, *events_since_calls])
+            call = replace(call, success=call_success)  # type: ignore
+        updated_calls.append(call)
+    return save_events([*updated_calls, *updated_events])
 
 
 def increment_action_number() -> Literal[True]:
@@ -794,6 +881,9 @@ async def run_mind() -> None:
     action_batch_number = global_state.action_batch_number
     completed_actions = action_batch_number - 1
     run_state = RunState(state_file=settings.RUN_STATE_FILE)
+    if not run_state.output:
+        # build the model client in the background while the prompt is being assembled
+        Thread(target=settings.get_core_model, daemon=True).start()
     opened_agent_id = global_state.opened_agent_id
     run_state.messages_updated = run_state.messages_updated or update_messages(
         run_state, opened_agent_id
@@ -817,7 +907,8 @@ async def run_mind() -> None:
         action_batch_number=action_batch_number,
         focused_goal_id=goals.focused,
     )
-    breakpoint()
+    if __debug__ and settings.DEBUG:
+        breakpoint()
     call_event_batch = feed.call_event_batch()
     last_function_batch = [
         event for event in call_event_batch if isinstance(event, FunctionCallEvent)
@@ -840,56 +931,69 @@ async def run_mind() -> None:
         run_state.events_updated = run_state.events_updated or update_new_events(
             last_function_batch, events_since_call, feed_review
         )
-    run_state.call_events = run_state.call_events or [
-        {
-            "id": generate_id(),
-            "timestamp": get_timestamp(),
-            "batch_number": action_batch_number,
-            "goal_id": str(goals.focused) if goals.focused else None,
-            "summary": function_call["call_summary"],
-            "content": as_yaml_str(function_call),
-        }
-        for function_call in system_function_calls
-    ]
-    function_call_events = [
-        FunctionCallEvent.from_mapping(call_event)
-        for call_event in run_state.call_events
-    ]
+    if run_state.call_events:
+        # resuming a run that already created its call events
+        function_call_events = [
+            FunctionCallEvent.from_mapping(call_event)
+            for call_event in run_state.call_events
+        ]
+    else:
+        # ids are only persisted once for the whole batch of events, before the events themselves are saved
+        with global_state.batch():
+            function_call_events = [
+                FunctionCallEvent(
+                    id=generate_id(),
+                    batch_number=action_batch_number,
+                    goal_id=goals.focused,
+                    summary=function_call["call_summary"],
+                    content=as_yaml_str(function_call),
+                )
+                for function_call in system_function_calls
+            ]
+        run_state.call_events = [event.to_mapping() for event in function_call_events]
     for function_call, call_event in zip(system_function_calls, function_call_events):
-        if call_event.id in run_state.call_results:
+        call_key = str(call_event.id)
+        if call_key in run_state.call_results:
             continue
         run_state.call_results = {
             **run_state.call_results,
-            call_event.id: await call_system_function(function_call),
-        }
-    run_state.call_result_events = run_state.call_result_events or [
-        {
-            "id": generate_id(),
-            "timestamp": get_timestamp(),
-            "batch_number": action_batch_number,
-            "goal_id": goals.focused,
-            "function_call_id": call_event.id,
-            "content": call_result,
+            call_key: await call_system_function(function_call),
         }
-        for call_event, call_result in zip(
-            function_call_events, run_state.call_results.values()
-        )
-    ]
-    call_result_events = [
-        CallResultEvent.from_mapping(result_event)
-        for result_event in run_state.call_result_events
-    ]
+    if run_state.call_result_events:
+        call_result_events = [
+            CallResultEvent.from_mapping(result_event)
+            for result_event in run_state.call_result_events
+        ]
+    else:
+        with global_state.batch():
+            call_result_events = [
+                CallResultEvent(
+                    id=generate_id(),
+                    batch_number=action_batch_number,
+                    goal_id=goals.focused,
+                    function_call_id=call_event.id,
+                    content=call_result,
+                )
+                for call_event, call_result in zip(
+                    function_call_events, run_state.call_results.values()
+                )
+            ]
+        run_state.call_result_events = [
+            event.to_mapping() for event in call_result_events
+        ]
     new_events = [*function_call_events, *call_result_events]
-    run_state.events_saved = run_state.events_saved or save_events(new_events)
-    if opened_agent_id is not None:
-        mark_messages_read(opened_agent_id)
-    run_state.action_number_incremented = (
-        run_state.action_number_incremented or increment_action_number()
-    )
-    read_event.cache_clear()
+    # the remaining steps are each guarded by their own flag, so they only need a single save at the end
+    with run_state.batch():
+        run_state.events_saved = run_state.events_saved or save_events(new_events)
+        if opened_agent_id is not None:
+            mark_messages_read(opened_agent_id)
+        run_state.action_number_incremented = (
+            run_state.action_number_incremented or increment_action_number()
+        )
     read_goal.cache_clear()
     run_state.archive()
     print("Action run complete.")
 
 
-asyncio.run(run_mind())
+if __name__ == "__main__":
+    asyncio.run(run_mind())
@@ -1,10 +1,15 @@
 """Helpers for systems."""
 
+from contextlib import contextmanager
+from dataclasses import dataclass, field
 import datetime
+from functools import lru_cache
+import json
 import os
 from pathlib import Path
 import platform
-from typing import Mapping, Any, Sequence, NewType
+from types import MappingProxyType
+from typing import Iterator, Mapping, Any, Sequence, NewType
 
 from ruamel.yaml import YAML
 from ruamel.yaml.compat import StringIO
@@ -22,10 +27,8 @@ DEFAULT_YAML = YAML()
 # DEFAULT_YAML.default_flow_style = None
 # DEFAULT_YAML.default_style = "|"  # type: ignore
 DEFAULT_YAML.allow_unicode = True
-LONG_STR_YAML = YAML()
-LONG_STR_YAML.default_flow_style = None
-LONG_STR_YAML.default_style = "|"  # type: ignore
-LONG_STR_YAML.allow_unicode = True
+# libyaml-backed loader without round-trip bookkeeping; use for data that isn't dumped back out with its original formatting
+FAST_YAML = YAML(typ="safe", pure=False)
 
 ENCODER = tiktoken.get_encoding("cl100k_base")
 
@@ -33,18 +36,49 @@ ENCODER = tiktoken.get_encoding("cl100k_base")
 def save_yaml(
     data: Mapping[str, Any], location: Path, yaml: YAML = DEFAULT_YAML
 ) -> None:
-    """Save YAML to a file, making sure the directory exists."""
-    if not location.exists():
+    """Save YAML to a file atomically, making sure the directory exists."""
+    temp_file = location.with_name(f"{location.name}.tmp")
+    try:
+        yaml.dump(data, temp_file)  # type: ignore
+    except FileNotFoundError:
         os.makedirs(location.parent, exist_ok=True)
-    yaml.dump(data, location)  # type: ignore
+        yaml.dump(data, temp_file)  # type: ignore
+    os.replace(temp_file, location)
 
 
-def load_yaml(location: Path, yaml: YAML = DEFAULT_YAML) -> Any:
+def load_yaml(location: Path, yaml: YAML = FAST_YAML) -> Any:
     """Load YAML from a file."""
     with location.open("r", encoding="utf-8") as file:
         return yaml.load(file)  # type: ignore
 
 
+def as_json_str(data: Any) -> str:
+    """Dump data to a JSON string, formatted the same way as `save_json`."""
+    return json.dumps(data, indent=2, ensure_ascii=False)
+
+
+def save_json(data: Any, location: Path) -> None:
+    """Save JSON to a file, making sure the directory exists."""
+    save_text(as_json_str(data), location)
+
+
+def save_text(text: str, location: Path) -> None:
+    """Save text to a file atomically, making sure the directory exists. Writes to a temporary file first so an interrupted write can't leave a truncated file behind."""
+    temp_file = location.with_name(f"{location.name}.tmp")
+    try:
+        temp_file.write_text(text, encoding="utf-8")
+    except FileNotFoundError:
+        # only create the directory when it's actually missing, rather than checking on every save
+        os.makedirs(location.parent, exist_ok=True)
+        temp_file.write_text(text, encoding="utf-8")
+    os.replace(temp_file, location)
+
+
+def load_json(location: Path) -> Any:
+    """Load JSON from a file."""
+    return json.loads(location.read_text(encoding="utf-8"))
+
+
 def from_yaml_str(yaml_str: str, yaml: YAML = DEFAULT_YAML) -> Any:
     """Load yaml from a string."""
     return yaml.load(yaml_str)  # type: ignore
@@ -61,19 +95,28 @@ def as_yaml_str(
 
 def get_timestamp() -> Timestamp:
     """Get the current timestamp in UTC with microseconds."""
-    return Timestamp(f"{datetime.datetime.now(tz=None).isoformat()}Z")
+    return Timestamp(
+        f"{datetime.datetime.now(tz=None).isoformat(timespec='microseconds')}Z"
+    )
 
 
 def format_timestamp(timestamp: datetime.datetime | str) -> Timestamp:
     """Format a timestamp into what we're using in this codebase."""
     if isinstance(timestamp, str):
         timestamp = datetime.datetime.fromisoformat(timestamp)
-    return Timestamp(timestamp.strftime("%Y-%m-%dT%H:%M:%S.%f") + "Z")
+    # same output as strftime("%Y-%m-%dT%H:%M:%S.%f"), without reparsing a format string for every event loaded
+    return Timestamp(
+        f"{timestamp.replace(tzinfo=None).isoformat(timespec='microseconds')}Z"
+    )
+
+
+TIMESTAMP_FILENAME_TABLE = str.maketrans({":": "-", ".": "-", "T": "_T"})
+"Translation table for converting a timestamp to a filename in a single pass."
 
 
 def timestamp_to_filename(timestamp: str) -> str:
     """Convert a timestamp to a filename."""
-    return timestamp.replace(":", "-").replace(".", "-").replace("T", "_T")
+    return timestamp.translate(TIMESTAMP_FILENAME_TABLE)
 
 
 def filename_to_timestamp(filename: str) -> Timestamp:
@@ -89,10 +132,44 @@ def count_tokens(text: str) -> int:
     return len(ENCODER.encode(text))
 
 
-def get_machine_info() -> dict[str, str]:
+@lru_cache(maxsize=1)
+def get_machine_info() -> Mapping[str, str]:
     """Get system information."""
-    return {
-        "system": platform.system(),
-        "release": platform.release(),
-        "machine": platform.machine(),
-    }
+    return MappingProxyType(
+        {
+            "system": platform.system(),
+            "release": platform.release(),
+            "machine": platform.machine(),
+        }
+    )
+
+
+@dataclass(slots=True)
+class BatchedSaves:
+    """Base for state that's saved to disk on every change, with saves that can be deferred using `batch`."""
+
+    _batching: bool = field(default=False, init=False, repr=False)
+    _dirty: bool = field(default=False, init=False, repr=False)
+
+    def save(self) -> None:
+        """Save the state to disk."""
+        raise NotImplementedError
+
+    def save_unless_batching(self) -> None:
+        """Save the state, or just mark it as changed if saving is being batched."""
+        if self._batching:
+            self._dirty = True
+            return
+        self.save()
+
+    @contextmanager
+    def batch(self) -> Iterator[None]:
+        """Defer saves until the end of the block, then save once if anything changed, even if the block raises."""
+        self._batching = True
+        try:
+            yield
+        finally:
+            self._batching = False
+            if self._dirty:
+                self._dirty = False
+                self.save()
@@ -1,76 +1,107 @@
 """Model utilities."""
 
-from functools import wraps
-from typing import Callable, Sequence, TypeVar
+import asyncio
+import sys
+from typing import TYPE_CHECKING, Sequence
 
 from colorama import Fore
-from langchain_core.language_models import BaseChatModel
-from langchain_core.messages import BaseMessage  # , AIMessage, ToolCall
 
-from autonomous_mind.systems.config.settings import CORE_MODEL
+from autonomous_mind.systems.config.settings import get_core_model
+
+if TYPE_CHECKING:
+    from langchain_core.language_models import BaseChatModel
+    from langchain_core.messages import BaseMessage  # , AIMessage, ToolCall
 
 # from langchain_core.tools import tool
 
 
-def format_messages(messages: Sequence[BaseMessage]) -> str:
+def format_messages(messages: Sequence["BaseMessage"]) -> str:
     """Format model messages into something printable."""
     return "\n\n---\n\n".join(
         [f"[{message.type.upper()}]:\n\n{message.content}" for message in messages]  # type: ignore
     )
 
 
-T = TypeVar("T")
-QueryFunction = Callable[..., T]
-
+MAX_CONNECTION_RETRIES = 3
+"Maximum number of times a query whose connection drops is retried (or, when streaming, resumed) before giving up."
 
-def wrap_printout(
-    query_func: QueryFunction[T], color: str, preamble: str | None, printout: bool
-) -> QueryFunction[T]:
-    """Wrap a query function to print the result."""
 
-    @wraps(query_func)
-    def wrapper(*args: object, **kwargs: object) -> T:
-        if preamble is not None:
-            print(f"\033[1;34m{preamble}\033[0m")
-        result = query_func(*args, **kwargs)
+async def stream_model(
+    model: "BaseChatModel",
+    messages: Sequence["BaseMessage"],
+    color: str,
+    printout: bool,
+) -> str:
+    """Stream a response from an LLM chat model, printing chunks as they arrive. If the connection drops partway through, the stream is resumed by prefilling the response received so far, instead of starting over."""
+    from anthropic import APIConnectionError
+    from httpx import TransportError
+    from langchain_core.messages import AIMessage
+
+    chunks: list[str] = []
+    # set the color once for the whole stream rather than wrapping every chunk
+    if printout:
+        print(color, end="")
+    try:
+        for attempt in range(MAX_CONNECTION_RETRIES + 1):
+            # the API rejects prefills that end in whitespace, so the model regenerates it
+            received = "".join(chunks).rstrip()
+            chunks = [received]
+            query_messages = (
+                [*messages, AIMessage(content=received)] if received else messages
+            )
+            try:
+                async for chunk in model.astream(query_messages):
+                    if printout:
+                        print(chunk.content, end="", flush=True)
+                    chunks.append(chunk.content)
+                break
+            except (APIConnectionError, TransportError):
+                if attempt == MAX_CONNECTION_RETRIES:
+                    raise
+                await asyncio.sleep(2**attempt)
+    finally:
         if printout:
-            print(f"{color}{result}{Fore.RESET}")
-        return result
+            print(Fore.RESET, end="", flush=True)
+    return "".join(chunks)
 
-    return wrapper
+
+async def invoke_model(
+    model: "BaseChatModel",
+    messages: Sequence["BaseMessage"],
+    color: str,
+    printout: bool,
+) -> str:
+    """Get a complete response from an LLM chat model, retrying if the connection drops."""
+    from anthropic import APIConnectionError
+    from httpx import TransportError
+
+    for attempt in range(MAX_CONNECTION_RETRIES + 1):
+        try:
+            result = str((await model.ainvoke(messages)).content)
+            break
+        except (APIConnectionError, TransportError):
+            if attempt == MAX_CONNECTION_RETRIES:
+                raise
+            await asyncio.sleep(2**attempt)
+    if printout:
+        # color codes are just noise when output is going to a log rather than a terminal
+        print(f"{color}{result}{Fore.RESET}" if sys.stdout.isatty() else result)
+    return result
 
 
 async def query_model(
-    messages: Sequence[BaseMessage],
-    model: BaseChatModel = CORE_MODEL,
+    messages: Sequence["BaseMessage"],
+    model: "BaseChatModel | None" = None,
     color: str = Fore.RESET,
     preamble: str | None = None,
     printout: bool = True,
     stream: bool = False,
 ) -> str:
     """Query an LLM chat model. `preamble` is printed before the result."""
-
-    if stream:
-
-        async def query(messages: Sequence[BaseMessage]) -> str:
-            output = model.astream(messages)
-            chunks: list[str] = []
-            async for chunk in output:
-                if printout:
-                    print(f"{color}{chunk.content}{Fore.RESET}", end="", flush=True)
-                chunks.append(chunk.content)
-            return "".join(chunks)
-
-        wrapped_query = wrap_printout(query, color, preamble, printout=False)
-
-    else:
-
-        async def query(messages: Sequence[BaseMessage]) -> str:
-            return str(model.ainvoke(messages).content)
-
-        wrapped_query = wrap_printout(query, color, preamble, printout)
-
-    return await wrapped_query(messages)
+    if preamble is not None:
+        print(f"\033[1;34m{preamble}\033[0m")
+    query = stream_model if stream else invoke_model
+    return await query(model or get_core_model(), messages, color, printout)
 
     # if preamble is not None and printout:
     #     print(f"\033[1;34m{preamble}\033[0m")
@@ -1,14 +1,20 @@
 """Printout functions for various objects."""
 
-from autonomous_mind.helpers import as_yaml_str, from_yaml_str
+from textwrap import indent
+
 from autonomous_mind.schema import Item
 
 
+def as_yaml_list_item(item_yaml: str) -> str:
+    """Wrap a YAML mapping string as a single-item YAML list, without a parse/dump round trip."""
+    return "- " + indent(item_yaml.rstrip("\n"), "  ")[2:]
+
+
 def full_itemized_repr(item: Item) -> str:
     """Give full representation of event as an item."""
-    return as_yaml_str([from_yaml_str(repr(item))])
+    return as_yaml_list_item(repr(item))
 
 
 def short_itemized_repr(item: Item) -> str:
     """Give short representation of an item."""
-    return as_yaml_str([from_yaml_str(str(item))])
+    return as_yaml_list_item(str(item))
@@ -1,8 +1,8 @@
 """Schema definitions for system data structures."""
 
-from dataclasses import dataclass, field
+from dataclasses import asdict, dataclass, field
 from textwrap import indent
-from typing import Any, Literal, Mapping, MutableMapping, Self
+from typing import Any, Literal, Mapping, Self
 
 from autonomous_mind.helpers import (
     Timestamp,
@@ -10,12 +10,12 @@ from autonomous_mind.helpers import (
     from_yaml_str,
     get_timestamp,
 )
-from autonomous_mind.text import dedent_and_strip
+from autonomous_mind.text import dedent_template
 
 ItemId = int | str
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class FunctionCallEvent:
     """An action event."""
 
@@ -30,12 +30,17 @@ class FunctionCallEvent:
     success: Literal[-1, 0, 1] = 0
 
     @classmethod
-    def from_mapping(cls, mapping: MutableMapping[str, Any]) -> Self:
+    def from_mapping(cls, mapping: Mapping[str, Any]) -> Self:
         """Create event from a mapping."""
+        mapping = dict(mapping)
         mapping["goal_id"] = mapping["goal_id"] or None
         mapping["timestamp"] = format_timestamp(mapping["timestamp"])
         return cls(**mapping)
 
+    def to_mapping(self) -> dict[str, Any]:
+        """Convert the event to a mapping that `from_mapping` can read back."""
+        return asdict(self)
+
     def __repr__(self) -> str:
         """Get the string representation of the event."""
         template = """
@@ -52,7 +57,7 @@ class FunctionCallEvent:
         """
         summary = indent(self.summary, "  ")
         content = indent(self.content, "  ")
-        return dedent_and_strip(template).format(
+        return dedent_template(template).format(
             id=self.id,
             goal_id=self.goal_id or "!!null",
             batch_number=self.batch_number,
@@ -77,7 +82,7 @@ class FunctionCallEvent:
         success: {success}
         """
         summary = indent(self.summary, "  ")
-        return dedent_and_strip(template).format(
+        return dedent_template(template).format(
             id=self.id,
             goal_id=self.goal_id or "!!null",
             timestamp=self.timestamp,
@@ -87,7 +92,7 @@ class FunctionCallEvent:
         )
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class CallResultEvent:
     """Event for result of calls."""
 
@@ -110,6 +115,10 @@ class CallResultEvent:
         mapping["timestamp"] = format_timestamp(mapping["timestamp"])
         return cls(**mapping)
 
+    def to_mapping(self) -> dict[str, Any]:
+        """Convert the event to a mapping that `from_mapping` can read back."""
+        return asdict(self)
+
     def __repr__(self) -> str:
         """Get the string representation of the event."""
         template = """
@@ -126,7 +135,7 @@ class CallResultEvent:
         """
         content = indent(self.content, "  ")
         summary = indent(self.summary, "  ")
-        return dedent_and_strip(template).format(
+        return dedent_template(template).format(
             id=self.id,
             goal_id=self.goal_id or "!!null",
             timestamp=self.timestamp,
@@ -151,7 +160,7 @@ class CallResultEvent:
           [Collapsed]
         """
         summary = indent(self.summary, "  ")
-        return dedent_and_strip(template).format(
+        return dedent_template(template).format(
             id=self.id,
             goal_id=self.goal_id or "!!null",
             timestamp=self.timestamp,
@@ -198,7 +207,7 @@ class NotificationEvent:
         """
         summary = indent(self.summary, "  ")
         content = indent(self.content, "  ")
-        return dedent_and_strip(template).format(
+        return dedent_template(template).format(
             id=self.id,
             timestamp=self.timestamp,
             batch_number=self.batch_number,
@@ -214,7 +223,7 @@ class NotificationEvent:
 Event = FunctionCallEvent | CallResultEvent | NotificationEvent
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Goal:
     """A goal for the Mind."""
 
@@ -247,7 +256,7 @@ class Goal:
         """
         summary = indent(self.summary, "  ")
         details = indent(self.details or "", "  ")
-        return dedent_and_strip(template).format(
+        return dedent_template(template).format(
             id=self.id,
             timestamp=self.timestamp,
             batch_number=self.batch_number,
@@ -273,7 +282,7 @@ class Goal:
           [Collapsed]
         """
         summary = indent(self.summary, "  ")
-        return dedent_and_strip(template).format(
+        return dedent_template(template).format(
             id=self.id,
             timestamp=self.timestamp,
             batch_number=self.batch_number,
@@ -318,7 +327,7 @@ class Note:
         summary = indent(self.summary, "  ")
         context = indent(self.context, "  ")
         content = indent(self.content, "  ")
-        return dedent_and_strip(template).format(
+        return dedent_template(template).format(
             id=self.id,
             timestamp=self.timestamp,
             batch_number=self.batch_number,
@@ -344,7 +353,7 @@ class Note:
         """
         summary = indent(self.summary, "  ")
         context = indent(self.context, "  ")
-        return dedent_and_strip(template).format(
+        return dedent_template(template).format(
             id=self.id,
             timestamp=self.timestamp,
             batch_number=self.batch_number,
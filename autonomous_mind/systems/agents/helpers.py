@@ -7,7 +7,7 @@ from typing import Literal, Mapping
 
 from autonomous_mind.systems.config import settings
 from autonomous_mind.systems.config.global_state import global_state
-from autonomous_mind.helpers import get_timestamp, load_yaml, save_yaml
+from autonomous_mind.helpers import DEFAULT_YAML, get_timestamp, load_yaml, save_yaml
 from autonomous_mind.id_generation import generate_id
 from autonomous_mind.schema import ItemId, NotificationEvent
 
@@ -134,7 +134,8 @@ def read_agent_conversation(
 def mark_messages_read(agent_id: ItemId) -> None:
     """Mark messages as read."""
     record_file = get_record_file(agent_id)
-    messages = load_yaml(record_file)
+    # round-trip load so the messages keep their block formatting when saved back
+    messages = load_yaml(record_file, yaml=DEFAULT_YAML)
     for message in messages:
         message["new"] = False
     save_yaml(messages, record_file)
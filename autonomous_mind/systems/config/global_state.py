@@ -4,11 +4,11 @@ from dataclasses import dataclass, field
 from typing import Any, MutableMapping, Sequence
 from autonomous_mind.schema import ItemId
 from autonomous_mind.systems.config.settings import GLOBAL_STATE_FILE
-from autonomous_mind.helpers import as_yaml_str, load_yaml
+from autonomous_mind.helpers import BatchedSaves, load_yaml, save_yaml
 
 
 @dataclass
-class GlobalState:
+class GlobalState(BatchedSaves):
     """Global state management."""
 
     mapping: MutableMapping[str, Any] = field(
@@ -16,10 +16,14 @@ class GlobalState:
         init=False,
     )
 
+    def save(self) -> None:
+        """Save the global state to disk."""
+        save_yaml(self.mapping, GLOBAL_STATE_FILE)
+
     def set_value(self, key: str, value: Any) -> None:
         """Set a global state variable."""
         self.mapping[key] = value
-        GLOBAL_STATE_FILE.write_text(as_yaml_str(self.mapping), encoding="utf-8")
+        self.save_unless_batching()
 
     @property
     def action_batch_number(self) -> int:
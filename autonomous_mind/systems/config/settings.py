@@ -1,16 +1,21 @@
 """Configuration loader."""
 
+from functools import lru_cache
+import os
 from pathlib import Path
+from typing import TYPE_CHECKING
 
-from langchain_anthropic import ChatAnthropic
+from autonomous_mind.helpers import DEFAULT_YAML, as_yaml_str, load_yaml
 
-from autonomous_mind.helpers import as_yaml_str, load_yaml
+if TYPE_CHECKING:
+    from langchain_anthropic import ChatAnthropic
 
 CONFIG_FILE = Path("data/config.yaml")
-CONFIG_DATA = load_yaml(CONFIG_FILE)
+# round-trip loaded, since the config is saved back with its comments and block strings intact
+CONFIG_DATA = load_yaml(CONFIG_FILE, yaml=DEFAULT_YAML)
 GLOBAL_STATE_FILE = Path("data/global_state.yaml")
 RUN_STATE_DIRECTORY = Path("data/run_state")
-RUN_STATE_FILE = RUN_STATE_DIRECTORY / "current.yaml"
+RUN_STATE_FILE = RUN_STATE_DIRECTORY / "current.json"
 RUN_STATE_DIRECTORY.mkdir(parents=True, exist_ok=True)
 SOURCE_DIRECTORY = Path(__file__).parent.parent
 BUILD_CONFIG_FILE = Path("pyproject.toml")
@@ -28,12 +33,20 @@ MEMORIES_DIRECTORY.mkdir(parents=True, exist_ok=True)
 NAME = CONFIG_DATA["name"]
 ID = CONFIG_DATA["id"]
 LLM_BACKEND = CONFIG_DATA["llm_backend"]
-CORE_MODEL = ChatAnthropic(  # type: ignore
-    temperature=0.8, model=LLM_BACKEND, verbose=False, max_tokens_to_sample=4096  # type: ignore
-)
 DEVELOPER_ID = CONFIG_DATA["developer_id"]
 DEVELOPER_NAME = CONFIG_DATA["developer_name"]
 SELF_DESCRIPTION = as_yaml_str(CONFIG_DATA["self_description"])
 COMPUTE_RATE = str(CONFIG_DATA["compute_rate"]).format(agent_name=NAME)
 MAX_RECENT_FEED_TOKENS = CONFIG_DATA["feed"]["max_recent_tokens"]
 SHELL_NAME = CONFIG_DATA["tmux_session_name"]
+DEBUG = os.environ.get("AMM_DEBUG", "").lower() not in ("", "0", "false")
+
+
+@lru_cache(maxsize=1)
+def get_core_model() -> "ChatAnthropic":
+    """Get the core model, building the client on first use."""
+    from langchain_anthropic import ChatAnthropic
+
+    return ChatAnthropic(  # type: ignore
+        temperature=0.8, model=LLM_BACKEND, verbose=False, max_tokens_to_sample=4096  # type: ignore
+    )
@@ -1,8 +1,10 @@
 """Event classes for the feed system."""
 
+import os
 from dataclasses import dataclass
 from functools import cached_property
 from pathlib import Path
+from typing import Iterator
 
 from autonomous_mind.systems.config import settings
 from autonomous_mind.systems.config.global_state import global_state
@@ -23,15 +25,21 @@ class Feed:
     events_directory: Path
 
     @cached_property
-    def event_files(self) -> list[Path]:
-        """Get the timestamps of all events."""
-        return sorted(list(self.events_directory.iterdir()))
+    def event_filenames(self) -> list[str]:
+        """Get the filenames of all events, which sort chronologically since they're timestamps."""
+        with os.scandir(self.events_directory) as entries:
+            return sorted(entry.name for entry in entries)
+
+    def newest_event_files(self) -> Iterator[Path]:
+        """Iterate through event files from newest to oldest, only building paths for the files actually visited."""
+        for filename in reversed(self.event_filenames):
+            yield self.events_directory / filename
 
     def call_event_batch(self, action_batch_limit: int = 1) -> list[Event]:
         """New events since a certain number of actions ago."""
         events: list[Event] = []
         # action_count = 0
-        for event_file in reversed(self.event_files):
+        for event_file in self.newest_event_files():
             event = read_event(event_file)
             if global_state.action_batch_number - event.batch_number > action_batch_limit:
                 break
@@ -52,9 +60,10 @@ class Feed:
     ) -> str | None:
         """Get a printable representation of the feed."""
         # max_semi_recent_tokens = 1000
-        recent_events_text = ""
+        recent_action_texts: list[str] = []
+        recent_events_tokens = 0
         current_action_text = ""
-        for file in reversed(self.event_files):
+        for file in self.newest_event_files():
             event = read_event(file)
             # we represent the event differently depending on various conditions
             batch_recency = global_state.action_batch_number - event.batch_number
@@ -78,15 +87,15 @@ class Feed:
             if not isinstance(event, FunctionCallEvent):
                 continue
             batch_recency += 1
-            proposed_recent_events_text = "\n".join(
-                [current_action_text, recent_events_text]
+            # tokenize each action once and keep a running total, rather than retokenizing the whole feed
+            proposed_recent_events_tokens = recent_events_tokens + count_tokens(
+                current_action_text
             )
-            if (
-                count_tokens(proposed_recent_events_text)
-                > settings.MAX_RECENT_FEED_TOKENS
-            ):
-                breakpoint()
-                raise NotImplementedError("TODO: Rewind back to `recent_events_text`.")
-            recent_events_text = proposed_recent_events_text
+            if proposed_recent_events_tokens > settings.MAX_RECENT_FEED_TOKENS:
+                if __debug__ and settings.DEBUG:
+                    breakpoint()
+                raise NotImplementedError("TODO: Rewind back to `recent_action_texts`.")
+            recent_action_texts.append(current_action_text)
+            recent_events_tokens = proposed_recent_events_tokens
             current_action_text = ""
-        return recent_events_text.strip() or None
+        return "\n".join(reversed(recent_action_texts)).strip() or None
@@ -2,6 +2,8 @@
 
 # pylint: disable=line-too-long
 
+from dataclasses import replace
+
 from autonomous_mind.systems.config.global_state import global_state
 from autonomous_mind.helpers import get_timestamp
 from autonomous_mind.id_generation import generate_id
@@ -42,8 +44,11 @@ async def edit_goal(goal_id: int, new_summary: str | None, new_details: str | No
     """Edit a goal with the given `goal_id`. Any parameter set to None will not be changed."""
 
     goal = find_goal(goal_id)
-    goal.summary = new_summary or goal.summary
-    goal.details = new_details or goal.details
-    goal.parent_goal_id = new_parent_goal_id or goal.parent_goal_id
+    goal = replace(
+        goal,
+        summary=new_summary or goal.summary,
+        details=new_details or goal.details,
+        parent_goal_id=new_parent_goal_id or goal.parent_goal_id,
+    )
     save_goals([goal])
     return f"GOAL_SYSTEM: Goal {goal.id} updated."
@@ -5,7 +5,6 @@ from functools import cached_property
 from pathlib import Path
 
 from autonomous_mind.systems.config.global_state import global_state
-from autonomous_mind.helpers import as_yaml_str
 from autonomous_mind.printout import full_itemized_repr, short_itemized_repr
 from autonomous_mind.schema import ItemId
 from autonomous_mind.systems.goals.helpers import find_goal, reorder_goals
@@ -44,7 +43,7 @@ class Goals:
         if len(self.goals_files) == 1:
             goal = read_goal(self.goals_files[0])
             if goal.id == self.focused:
-                return f"{as_yaml_str([goal.serialize()])}"
+                return full_itemized_repr(goal)
         goals = [read_goal(goal_file) for goal_file in self.goals_files]
         ordered_goals, orphaned_goals = reorder_goals(goals)
         if orphaned_goals:
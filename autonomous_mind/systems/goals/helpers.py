@@ -11,7 +11,10 @@ from autonomous_mind.systems.helpers import read_goal, save_items
 
 def save_goals(goals: Sequence[Goal]) -> Literal[True]:
     """Save a goal object to the goals file."""
-    return save_items(goals, settings.GOALS_DIRECTORY)
+    saved = save_items(goals, settings.GOALS_DIRECTORY)
+    # goals are frozen, so cached reads of the old versions have to be dropped
+    read_goal.cache_clear()
+    return saved
 
 
 def find_goal(goal_id: ItemId) -> Goal:
@@ -32,16 +32,25 @@ def save_events(events: Sequence[Event]) -> Literal[True]:
     return save_items(events, settings.EVENTS_DIRECTORY)
 
 
-@lru_cache(maxsize=None)
+EVENT_CACHE: dict[str, tuple[int, int, Event]] = {}
+"Parsed events by file path, along with the modification time and size they were parsed at, so rewritten files are re-read."
+
+
 def read_event(event_file: Path) -> Event:
-    """Read an event from disk."""
+    """Read an event from disk, skipping the YAML parse if the file hasn't changed since it was last read."""
+    stat = event_file.stat()
+    cached = EVENT_CACHE.get(str(event_file))
+    if cached is not None and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+        return cached[2]
     event_dict = load_yaml(event_file)
     type_mapping = {
         "function_call": FunctionCallEvent,
         "call_result": CallResultEvent,
         "notification": NotificationEvent,
     }
-    return type_mapping[event_dict["type"]].from_mapping(event_dict)
+    event = type_mapping[event_dict["type"]].from_mapping(event_dict)
+    EVENT_CACHE[str(event_file)] = (stat.st_mtime_ns, stat.st_size, event)
+    return event
 
 
 @lru_cache(maxsize=None)
@@ -1,8 +1,13 @@
 """Extract blocks from text."""
 
 from dataclasses import dataclass
+from functools import lru_cache
 import re
+from string import Formatter
 from textwrap import dedent, indent
+from typing import Any, Mapping
+
+TemplateParts = tuple[tuple[str, str | None], ...]
 
 
 def dedent_and_strip(text: str) -> str:
@@ -10,6 +15,28 @@ def dedent_and_strip(text: str) -> str:
     return dedent(text).strip()
 
 
+@lru_cache(maxsize=None)
+def dedent_template(template: str) -> str:
+    """Dedent and strip a template literal; cached, so don't use this for arbitrary text."""
+    return dedent_and_strip(template)
+
+
+def compile_template(template: str) -> TemplateParts:
+    """Parse a `str.format`-style template once into (literal text, field name) pairs, so that large templates don't need to be reparsed on every render. Conversions and format specs aren't supported."""
+    return tuple(
+        (literal_text, field_name)
+        for literal_text, field_name, _, _ in Formatter().parse(template)
+    )
+
+
+def render_template(parts: TemplateParts, fields: Mapping[str, Any]) -> str:
+    """Render a template compiled with `compile_template`."""
+    return "".join(
+        literal_text if field_name is None else f"{literal_text}{fields[field_name]}"
+        for literal_text, field_name in parts
+    )
+
+
 @dataclass(frozen=True)
 class ExtractionError(Exception):
     """Raised when an extraction fails."""
@@ -51,16 +78,24 @@ def extract_block(text: str, block_type: str) -> str | None:
     return match[1].strip() if match else None
 
 
-def extract_blocks(
-    text: str, start_block_type: str, end_block_type: str = "", prefix: str = ""
-) -> list[str] | None:
-    """Extracts specially formatted blocks of text from the LLM's output. `block_type` corresponds to a label for a markdown code block such as `yaml` or `python`."""
+@lru_cache(maxsize=None)
+def block_pattern(
+    start_block_type: str, end_block_type: str, prefix: str
+) -> re.Pattern[str]:
+    """Compile the pattern for a block type."""
     pattern = r"{prefix}{start_block_type}\n(.*?){prefix}{end_block_type}".format(  # pylint:disable=consider-using-f-string
         start_block_type=start_block_type,
         end_block_type=end_block_type,
         prefix=prefix,
     )
-    matches = re.findall(pattern, text, re.DOTALL)
+    return re.compile(pattern, re.DOTALL)
+
+
+def extract_blocks(
+    text: str, start_block_type: str, end_block_type: str = "", prefix: str = ""
+) -> list[str] | None:
+    """Extracts specially formatted blocks of text from the LLM's output. `block_type` corresponds to a label for a markdown code block such as `yaml` or `python`."""
+    matches = block_pattern(start_block_type, end_block_type, prefix).findall(text)
     return [match.strip() for match in matches] if matches else None
 
 